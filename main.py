@@ -1,16 +1,26 @@
 # filename: multi_waypoint_api.py
-import json
-import re
-import base64
-import polyline
-import requests
+import orjson
+import asyncio
+import functools
+import time
+import httpx
 import openai
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional, Tuple
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, List
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from cachetools import TTLCache
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 import os
 
 load_dotenv()  # Load environment variables from .env
@@ -26,7 +36,53 @@ GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MAPBOX_ACCESS_TOKEN = os.getenv("MAPBOX_ACCESS_TOKEN")
 
-openai.api_key = OPENAI_API_KEY
+if not GOOGLE_MAPS_API_KEY:
+    print("Warning: GOOGLE_MAPS_API_KEY is not set; Google lookups will fail.")
+
+# Cap on in-flight Google API requests per process, to stay under Google's QPS limits
+GMAPS_SEMAPHORE = asyncio.Semaphore(10)
+
+# Hosts the pipeline talks to after the LLM step (pre-warmed while the LLM runs)
+GOOGLE_API_ORIGINS = [
+    "https://maps.googleapis.com",
+    "https://places.googleapis.com",
+    "https://routes.googleapis.com",
+]
+
+# Idle pooled connections are dropped after this many seconds
+GOOGLE_KEEPALIVE_EXPIRY = 60
+
+# origin -> time.monotonic() of its last warm-up, so warm pools aren't re-warmed
+last_warmed = {}
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+background_tasks = set()
+
+# The shared HTTP and OpenAI clients live on app.state. `lifespan` (section 8)
+# creates and closes them; the accessors below create them on first use when the
+# runtime never runs ASGI lifespan events.
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        # Idle connections are kept for 60s so back-to-back prompts skip the TLS handshake
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=50,
+            keepalive_expiry=GOOGLE_KEEPALIVE_EXPIRY
+        )
+    )
+
+def get_http_client() -> httpx.AsyncClient:
+    if getattr(app.state, "http", None) is None:
+        app.state.http = create_http_client()
+    return app.state.http
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    # Raises openai.OpenAIError if OPENAI_API_KEY is missing
+    if getattr(app.state, "oai", None) is None:
+        app.state.oai = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return app.state.oai
 
 # -----------------------------------------------------------
 # 2. FastAPI Schema Definitions
@@ -55,6 +111,16 @@ class DirectionsResponse(BaseModel):
 class PromptRequest(BaseModel):
     prompt: str
 
+# Structured waypoints parsed from the LLM's JSON output
+class ParsedWaypoint(BaseModel):
+    type: Literal["address", "place_type"]
+    value: str
+
+class ParsedPrompt(BaseModel):
+    waypoints: List[ParsedWaypoint] = []
+    round_trip: bool = False
+    extra_notes: str = ""
+
 # -----------------------------------------------------------
 # 3. System Prompt for the LLM
 # -----------------------------------------------------------
@@ -96,58 +162,212 @@ Rules/notes:
 - If unsure how to parse the user input, add clarifications in "extra_notes".
 """
 
+# JSON schema the LLM output is constrained to (OpenAI structured outputs)
+WAYPOINTS_JSON_SCHEMA = {
+    "name": "waypoints",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "waypoints": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "type": {"type": "string", "enum": ["address", "place_type"]},
+                        "value": {"type": "string"}
+                    },
+                    "required": ["type", "value"],
+                    "additionalProperties": False
+                }
+            },
+            "round_trip": {"type": "boolean"},
+            "extra_notes": {"type": "string"}
+        },
+        "required": ["waypoints", "round_trip", "extra_notes"],
+        "additionalProperties": False
+    }
+}
+
 
 # -----------------------------------------------------------
 # 4. LLM Parsing for Waypoints
 # -----------------------------------------------------------
-def extract_waypoints(user_prompt: str) -> dict:
+async def extract_waypoints(user_prompt: str) -> ParsedPrompt:
     """
-    Ask the LLM (GPT-3.5-turbo) to parse the user's prompt into structured JSON 
-    with multiple waypoints and round_trip info.
+    Ask the LLM (gpt-4o-mini) to parse the user's prompt into structured JSON
+    with multiple waypoints and round_trip info. The response is constrained to
+    WAYPOINTS_JSON_SCHEMA, so the model can't return prose instead of JSON.
     """
+    # Outside the try: a missing/misconfigured client is a server error, not bad input
+    client = get_openai_client()
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
+            response_format={"type": "json_schema", "json_schema": WAYPOINTS_JSON_SCHEMA},
             temperature=0.2
         )
         raw_json = response.choices[0].message.content
-        parsed = json.loads(raw_json)
+        parsed = ParsedPrompt.model_validate_json(raw_json)
         print(parsed)
         return parsed
     except Exception as e:
         print("Error extracting waypoints:", e)
         # Return a default structure if parsing fails
-        return {
-            "waypoints": [],
-            "round_trip": False,
-            "extra_notes": "Error or invalid JSON from LLM."
-        }
+        return ParsedPrompt(extra_notes="Error or invalid JSON from LLM.")
 
 # -----------------------------------------------------------
 # 5. Geocoding and Places
 # -----------------------------------------------------------
-def geocode_address(address: str):
+# Transient Google statuses worth retrying: legacy web services report them in
+# "status", the v1 (Places/Routes) APIs in "error.status"
+RETRYABLE_GOOGLE_STATUSES = {
+    "OVER_QUERY_LIMIT",
+    "UNKNOWN_ERROR",
+    "RESOURCE_EXHAUSTED",
+    "UNAVAILABLE",
+    "INTERNAL",
+}
+
+def is_retryable_google_response(result: Tuple[int, dict]) -> bool:
+    status_code, body = result
+    if status_code == 429 or status_code >= 500:
+        return True
+    status = body.get("status") or body.get("error", {}).get("status")
+    return status in RETRYABLE_GOOGLE_STATUSES
+
+# Back off and retry rate-limited/transient failures; once attempts run out the
+# last response is returned (or the last exception re-raised) as-is. Timeouts
+# are not retried, so a slow host costs at most one client timeout per lookup.
+google_retry = retry(
+    wait=wait_exponential_jitter(initial=0.2, max=4),
+    stop=stop_after_attempt(4),
+    retry=(
+        retry_if_result(is_retryable_google_response)
+        | retry_if_exception_type((httpx.ConnectError, httpx.RemoteProtocolError))
+    ),
+    retry_error_callback=lambda retry_state: retry_state.outcome.result()
+)
+
+@google_retry
+async def send_google_request(method: str, url: str, **kwargs) -> Tuple[int, dict]:
+    """
+    Send one request to a Google API and return (HTTP status code, decoded JSON body).
+    Non-JSON bodies (e.g. an HTML 503 page) decode to {}.
+    """
+    async with GMAPS_SEMAPHORE:
+        resp = await get_http_client().request(method, url, **kwargs)
+    try:
+        body = orjson.loads(resp.content)
+    except orjson.JSONDecodeError:
+        body = {}
+    return resp.status_code, body
+
+async def google_get(url: str, params: dict) -> dict:
+    """
+    GET a Google Maps web service endpoint and return the decoded JSON body,
+    or {} if the request failed outright.
+    """
+    try:
+        _, body = await send_google_request("GET", url, params=params)
+    except httpx.HTTPError as e:
+        print("Google request failed:", url, e)
+        return {}
+    return body
+
+async def google_post(url: str, body: dict, headers: dict) -> dict:
+    """
+    POST a JSON body to a Google (Places/Routes v1) endpoint and return the decoded
+    JSON body, or {} if the request failed outright. The API key header is added here.
+    """
+    try:
+        _, resp_body = await send_google_request(
+            "POST",
+            url,
+            content=orjson.dumps(body),
+            headers={
+                **headers,
+                # An unset key still sends a (rejected) request instead of httpx raising
+                "X-Goog-Api-Key": GOOGLE_MAPS_API_KEY or "",
+                "Content-Type": "application/json"
+            }
+        )
+    except httpx.HTTPError as e:
+        print("Google request failed:", url, e)
+        return {}
+    return resp_body
+
+async def warm_google_connections():
+    """
+    Open pooled connections (DNS + TLS) to the Google API hosts ahead of time.
+    Hosts warmed within the keep-alive window are skipped, so busy workers don't
+    send extra requests. Uses keyless HEAD requests, so no quota is spent;
+    failures are ignored.
+    """
+    now = time.monotonic()
+    stale_origins = [
+        origin for origin in GOOGLE_API_ORIGINS
+        if now - last_warmed.get(origin, float("-inf")) > GOOGLE_KEEPALIVE_EXPIRY
+    ]
+    for origin in stale_origins:
+        last_warmed[origin] = now
+    http = get_http_client()
+    await asyncio.gather(
+        *[http.head(origin) for origin in stale_origins],
+        return_exceptions=True
+    )
+
+_CACHE_MISS = object()
+
+def async_ttl_cache(maxsize: int = 4096, ttl: int = 3600, key=None):
+    """
+    Memoize an async lookup's results in an in-process TTL cache.
+    `key` maps the call arguments to a cache key (defaults to the args tuple).
+    None results are not cached, so a miss is retried on the next request.
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @functools.wraps(func)
+        async def wrapper(*args):
+            cache_key = key(*args) if key else args
+            result = cache.get(cache_key, _CACHE_MISS)
+            if result is _CACHE_MISS:
+                result = await func(*args)
+                if result is not None:
+                    cache[cache_key] = result
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+@async_ttl_cache()
+async def geocode_address(address: str):
     """
     Use Google Maps Geocoding API to turn an address string into lat/lng.
-    Returns (lat, lng) or None if not found.
+    Returns (lat, lng, place_id) or None if not found.
     """
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {
         "address": address,
         "key": GOOGLE_MAPS_API_KEY
     }
-    resp = requests.get(url, params=params).json()
-    if resp["status"] == "OK":
-        location = resp["results"][0]["geometry"]["location"]
-        return (location["lat"], location["lng"])
+    resp = await google_get(url, params)
+    if resp.get("status") == "OK":
+        result = resp["results"][0]
+        location = result["geometry"]["location"]
+        return (location["lat"], location["lng"], result.get("place_id", ""))
     else:
         return None
 
-def find_nearest_place(origin_lat: float, origin_lng: float, place_type: str):
+# Round the origin to ~11m so nearby searches from (almost) the same spot share a cache entry
+@async_ttl_cache(key=lambda lat, lng, place_type: (round(lat, 4), round(lng, 4), place_type))
+async def find_nearest_place(origin_lat: float, origin_lng: float, place_type: str):
     """
     Use Google Places API to find the nearest place matching `place_type`.
     Returns (lat, lng, name, address, place_id) or None if not found.
@@ -159,8 +379,8 @@ def find_nearest_place(origin_lat: float, origin_lng: float, place_type: str):
         "rankby": "distance",
         "keyword": place_type
     }
-    resp = requests.get(url, params=params).json()
-    if resp["status"] == "OK" and len(resp["results"]) > 0:
+    resp = await google_get(url, params)
+    if resp.get("status") == "OK" and len(resp["results"]) > 0:
         place = resp["results"][0]
         lat = place["geometry"]["location"]["lat"]
         lng = place["geometry"]["location"]["lng"]
@@ -170,9 +390,11 @@ def find_nearest_place(origin_lat: float, origin_lng: float, place_type: str):
         return (lat, lng, name, address, place_id)
     return None
 
-def get_place_details(place_id: str):
+@async_ttl_cache()
+async def get_place_details(place_id: str):
     """
     Use Google Places Details API to fetch hours and photos for a given place_id.
+    Returns {"hours": [...], "photos": [...]} or None if the lookup failed.
     """
     url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
@@ -180,8 +402,8 @@ def get_place_details(place_id: str):
         "place_id": place_id,
         "fields": "name,formatted_address,geometry,opening_hours,photos"
     }
-    resp = requests.get(url, params=params).json()
-    if resp["status"] == "OK":
+    resp = await google_get(url, params)
+    if resp.get("status") == "OK":
         result = resp["result"]
         hours = result.get("opening_hours", {}).get("weekday_text", [])
         photos = result.get("photos", [])
@@ -190,50 +412,129 @@ def get_place_details(place_id: str):
             for p in photos
         ]
         return {"hours": hours, "photos": photo_refs}
-    return {"hours": [], "photos": []}
+    return None
+
+PLACES_SEARCH_FIELD_MASK = ",".join([
+    "places.location",
+    "places.regularOpeningHours.weekdayDescriptions",
+    "places.photos",
+])
+
+# After Text Search returns an error (e.g. Places API (New) not enabled on the key,
+# or still throttled after retries), address lookups go straight to the geocoder
+# for this many seconds instead of paying a failing POST on every waypoint
+TEXT_SEARCH_ERROR_COOLDOWN = 300
+text_search_paused_until = 0.0
+
+@async_ttl_cache()
+async def resolve_address(address: str):
+    """
+    Use Places API (New) Text Search to resolve an address to lat/lng, hours and
+    photos in a single round-trip.
+    Returns ((lat, lng), {"hours": [...], "photos": [...]}) or None if nothing matched
+    or Text Search is unavailable.
+    """
+    global text_search_paused_until
+    if time.monotonic() < text_search_paused_until:
+        return None
+
+    url = "https://places.googleapis.com/v1/places:searchText"
+    headers = {
+        "X-Goog-FieldMask": PLACES_SEARCH_FIELD_MASK
+    }
+    body = {"textQuery": address, "pageSize": 1}
+    resp = await google_post(url, body, headers)
+    if "error" in resp:
+        print("Places Text Search failed, using the geocoder for a while:", resp["error"])
+        text_search_paused_until = time.monotonic() + TEXT_SEARCH_ERROR_COOLDOWN
+        return None
+    places = resp.get("places", [])
+    if not places or "location" not in places[0]:
+        return None
+    place = places[0]
+    loc = (place["location"]["latitude"], place["location"]["longitude"])
+    hours = place.get("regularOpeningHours", {}).get("weekdayDescriptions", [])
+    photo_refs = [
+        f"https://places.googleapis.com/v1/{p['name']}/media?maxWidthPx=400&key={GOOGLE_MAPS_API_KEY}"
+        for p in place.get("photos", [])
+    ]
+    return loc, {"hours": hours, "photos": photo_refs}
+
+async def lookup_address_waypoint(address: str):
+    """
+    Resolve an address waypoint with a single Text Search call, falling back to
+    the Geocoding API (which also gives us the place_id) when Text Search finds nothing
+    or is erroring.
+    Returns ((lat, lng), place_id, place_details) or None if the address can't be found.
+    place_id is only set on the fallback path, where details still need fetching.
+    """
+    resolved = await resolve_address(address)
+    if resolved is not None:
+        loc, place_details = resolved
+        return loc, None, place_details
+
+    geocoded = await geocode_address(address)
+    if geocoded is None:
+        return None
+    lat, lng, place_id = geocoded
+    return (lat, lng), place_id, {"hours": [], "photos": []}
 
 # -----------------------------------------------------------
 # 6. Directions with Multiple Waypoints
 # -----------------------------------------------------------
-def get_directions_with_waypoints(waypoint_coords_list: List[tuple]):
+# Only the fields we actually read are requested, keeping the response small
+ROUTES_FIELD_MASK = ",".join([
+    "routes.polyline.encodedPolyline",
+    "routes.legs.localizedValues",
+    "routes.legs.steps.navigationInstruction.instructions",
+    "routes.legs.steps.localizedValues.distance",
+])
+
+def route_waypoint(lat: float, lng: float) -> dict:
+    """
+    Build a Routes API Waypoint for a lat/lng pair.
+    """
+    return {"location": {"latLng": {"latitude": lat, "longitude": lng}}}
+
+async def get_directions_with_waypoints(waypoint_coords_list: List[tuple]):
+    """
+    Use the Google Routes API (computeRoutes) to build a single route through all stops.
+    Returns (encoded_polyline, instructions, legs_metadata) or (None, [], []) on failure.
+    """
     if len(waypoint_coords_list) < 2:
         return None, [], []
 
-    origin = f"{waypoint_coords_list[0][0]},{waypoint_coords_list[0][1]}"
-    destination = f"{waypoint_coords_list[-1][0]},{waypoint_coords_list[-1][1]}"
-
-    waypoints_param = "|".join(
-        [f"{lat},{lng}" for (lat, lng) in waypoint_coords_list[1:-1]]
-    ) if len(waypoint_coords_list) > 2 else None
-
-    directions_url = "https://maps.googleapis.com/maps/api/directions/json"
-    params = {
-        "origin": origin,
-        "destination": destination,
-        "key": GOOGLE_MAPS_API_KEY
+    body = {
+        "origin": route_waypoint(*waypoint_coords_list[0]),
+        "destination": route_waypoint(*waypoint_coords_list[-1]),
+        "intermediates": [route_waypoint(*coords) for coords in waypoint_coords_list[1:-1]],
+        "travelMode": "DRIVE"
+    }
+    headers = {
+        "X-Goog-FieldMask": ROUTES_FIELD_MASK
     }
-    if waypoints_param:
-        params["waypoints"] = waypoints_param
 
-    resp = requests.get(directions_url, params=params).json()
-    if resp["status"] == "OK":
+    routes_url = "https://routes.googleapis.com/directions/v2:computeRoutes"
+    resp = await google_post(routes_url, body, headers)
+    if resp.get("routes"):
         route = resp["routes"][0]
-        overview_poly = route["overview_polyline"]["points"]
+        overview_poly = route["polyline"]["encodedPolyline"]
 
         instructions = []
         legs_metadata = []
 
         for leg in route["legs"]:
-            leg_distance = leg["distance"]["text"]
-            leg_duration = leg["duration"]["text"]
+            leg_values = leg.get("localizedValues", {})
             legs_metadata.append({
-                "distance": leg_distance,
-                "duration": leg_duration
+                "distance": leg_values.get("distance", {}).get("text", ""),
+                "duration": leg_values.get("duration", {}).get("text", "")
             })
 
-            for step in leg["steps"]:
-                step_text = re.sub('<[^<]+?>', '', step["html_instructions"])
-                instructions.append(f"{step_text} ({step['distance']['text']})")
+            for step in leg.get("steps", []):
+                # Routes API instructions are already plain text (no HTML to strip)
+                step_text = step.get("navigationInstruction", {}).get("instructions", "")
+                step_distance = step.get("localizedValues", {}).get("distance", {}).get("text", "")
+                instructions.append(f"{step_text} ({step_distance})")
 
         return overview_poly, instructions, legs_metadata
     else:
@@ -243,24 +544,42 @@ def get_directions_with_waypoints(waypoint_coords_list: List[tuple]):
 # -----------------------------------------------------------
 # 7. Main pipeline: multiple waypoints
 # -----------------------------------------------------------
-def process_user_prompt(user_prompt: str):
+def dedupe_consecutive_waypoints(waypoints: List[ParsedWaypoint]) -> List[ParsedWaypoint]:
+    """
+    Collapse back-to-back identical stops (e.g. "from UTSC to UTSC"),
+    comparing values case-insensitively.
+    """
+    deduped = []
+    for wp in waypoints:
+        if deduped and wp.type == deduped[-1].type and \
+                wp.value.strip().lower() == deduped[-1].value.strip().lower():
+            continue
+        deduped.append(wp)
+    return deduped
+
+async def process_user_prompt(user_prompt: str):
     """
     End-to-end pipeline:
       1) Extract array of waypoints + round_trip from LLM
       2) Convert each waypoint to lat/lng 
-         - if address => geocode
+         - if address => Places Text Search (geocode as a fallback)
          - if place_type => search near the previous waypoint
-      3) Build a single route with all stops in order
-      4) If round_trip=True, append the first stop again
-      5) Return the polyline, step instructions, waypoint details, round_trip, and notes
+      3) Fetch hours/photos for all stops concurrently
+      4) Build a single route with all stops in order
+      5) If round_trip=True, append the first stop again
+      6) Return the polyline, step instructions, waypoint details, round_trip, and notes
     """
-    # 1) Get structured waypoints from LLM
-    parsed = extract_waypoints(user_prompt)
-    waypoints = parsed.get("waypoints", [])
-    round_trip = parsed.get("round_trip", False)
-    notes = parsed.get("extra_notes", "")
-
-    if not waypoints:
+    # 1) Get structured waypoints from LLM, warming the Google connections meanwhile
+    warm_task = asyncio.create_task(warm_google_connections())
+    background_tasks.add(warm_task)
+    warm_task.add_done_callback(background_tasks.discard)
+    parsed = await extract_waypoints(user_prompt)
+    waypoints = dedupe_consecutive_waypoints(parsed.waypoints)
+    round_trip = parsed.round_trip
+    notes = parsed.extra_notes
+
+    # Reject unusable LLM output up front, before any Google calls are made
+    if not waypoints or any(not wp.value.strip() for wp in waypoints):
         return {
             "polyline": None,
             "instructions": [],
@@ -269,28 +588,45 @@ def process_user_prompt(user_prompt: str):
             "notes": "I couldn't parse any valid stops from your request."
         }
 
+    # Error if the first waypoint is a "place_type" with no origin
+    if waypoints[0].type == "place_type":
+        return {
+            "polyline": None,
+            "instructions": [],
+            "waypoints": [],
+            "round_trip": False,
+            "notes": "Your first waypoint is a place type, but no origin was provided."
+        }
+
+    # A single stop (e.g. "from UTSC to UTSC" after dedupe) can't form a route
+    if len(waypoints) < 2 and not round_trip:
+        return {
+            "polyline": None,
+            "instructions": [],
+            "waypoints": [],
+            "round_trip": round_trip,
+            "notes": "Not enough waypoints to create a route."
+        }
+
+    # Address waypoints don't depend on each other, so resolve them all concurrently;
+    # only place_type searches below need the previous stop's coordinates
+    address_idx = [i for i, wp in enumerate(waypoints) if wp.type == "address"]
+    address_results = dict(zip(address_idx, await asyncio.gather(*[
+        lookup_address_waypoint(waypoints[i].value) for i in address_idx
+    ])))
+
     coords_list = []
     detailed_waypoints = []
+    place_ids = []
 
     # 2) Convert each waypoint to lat/lng and collect details
     for i, wp in enumerate(waypoints):
-        wp_type = wp["type"]
-        wp_value = wp["value"]
-        place_details = {"hours": [], "photos": []}
-
-        # Error if the first waypoint is a "place_type" with no origin
-        if i == 0 and wp_type == "place_type":
-            return {
-                "polyline": None,
-                "instructions": [],
-                "waypoints": [],
-                "round_trip": False,
-                "notes": "Your first waypoint is a place type, but no origin was provided."
-            }
+        wp_type = wp.type
+        wp_value = wp.value
 
         if wp_type == "address":
-            loc = geocode_address(wp_value)
-            if loc is None:
+            address_info = address_results[i]
+            if address_info is None:
                 return {
                     "polyline": None,
                     "instructions": [],
@@ -298,21 +634,18 @@ def process_user_prompt(user_prompt: str):
                     "round_trip": round_trip,
                     "notes": f"Could not geocode address: {wp_value}"
                 }
-            # Attempt to fetch extended place details (optional)
-            place_info = find_nearest_place(loc[0], loc[1], wp_value)
-            if place_info and len(place_info) == 5:
-                _, _, _, _, place_id = place_info
-                place_details = get_place_details(place_id)
+            loc, place_id, place_details = address_info
 
             coords_list.append(loc)
-            detailed_waypoints.append({
-                "name": wp_value,
-                "address": wp_value,
-                "coordinates": loc,
-                "type": "Address",
-                "hours": place_details["hours"],
-                "photos": place_details["photos"]
-            })
+            place_ids.append(place_id)
+            detailed_waypoints.append(WaypointDetail(
+                name=wp_value,
+                address=wp_value,
+                coordinates=list(loc),
+                type="Address",
+                hours=place_details["hours"],
+                photos=place_details["photos"]
+            ))
 
         elif wp_type == "place_type":
             if not coords_list:
@@ -323,8 +656,9 @@ def process_user_prompt(user_prompt: str):
                     "round_trip": round_trip,
                     "notes": "No origin available for place search. Please specify an address first."
                 }
+            # Place searches stay sequential: each one starts from the previous stop
             origin_lat, origin_lng = coords_list[-1]
-            place_info = find_nearest_place(origin_lat, origin_lng, wp_value)
+            place_info = await find_nearest_place(origin_lat, origin_lng, wp_value)
             if place_info is None:
                 return {
                     "polyline": None,
@@ -334,19 +668,31 @@ def process_user_prompt(user_prompt: str):
                     "notes": f"Could not find a nearby place for: {wp_value}"
                 }
             lat, lng, name, addr, place_id = place_info
-            place_details = get_place_details(place_id)
 
             coords_list.append((lat, lng))
-            detailed_waypoints.append({
-                "name": name,
-                "address": addr,
-                "coordinates": (lat, lng),
-                "type": f"Place Type - {wp_value}",
-                "hours": place_details["hours"],
-                "photos": place_details["photos"]
-            })
-
-    # 3) Handle round trip
+            place_ids.append(place_id)
+            detailed_waypoints.append(WaypointDetail(
+                name=name,
+                address=addr,
+                coordinates=[lat, lng],
+                type=f"Place Type - {wp_value}"
+            ))
+
+    # 3) Fetch place details for every stop at once; a failed lookup just leaves
+    #    that stop without hours/photos
+    details_results = iter(await asyncio.gather(
+        *[get_place_details(place_id) for place_id in place_ids if place_id],
+        return_exceptions=True
+    ))
+    for wp_detail, place_id in zip(detailed_waypoints, place_ids):
+        if not place_id:
+            continue
+        place_details = next(details_results)
+        if isinstance(place_details, dict):
+            wp_detail.hours = place_details["hours"]
+            wp_detail.photos = place_details["photos"]
+
+    # 4) Handle round trip
     if round_trip and len(coords_list) > 0:
         coords_list.append(coords_list[0])
         detailed_waypoints.append(detailed_waypoints[0])  # duplicate
@@ -360,8 +706,8 @@ def process_user_prompt(user_prompt: str):
             "notes": "Not enough waypoints to create a route."
         }
 
-    # 4) Request directions from Google
-    overall_poly, step_instructions, leg_metadata = get_directions_with_waypoints(coords_list)
+    # 5) Request directions from Google
+    overall_poly, step_instructions, leg_metadata = await get_directions_with_waypoints(coords_list)
     if not overall_poly:
         return {
             "polyline": None,
@@ -371,7 +717,7 @@ def process_user_prompt(user_prompt: str):
             "notes": "Directions request failed. Please try again."
         }
 
-    # 5) Return everything in a structured dict
+    # 6) Return everything in a structured dict
     return {
         "polyline": overall_poly,
         "instructions": step_instructions,
@@ -385,7 +731,20 @@ def process_user_prompt(user_prompt: str):
 # -----------------------------------------------------------
 # 8. FastAPI App
 # -----------------------------------------------------------
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create one Google HTTP client and one OpenAI client per worker at startup,
+    and close both cleanly at shutdown.
+    """
+    app.state.http = create_http_client()
+    app.state.oai = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+    yield
+    await app.state.http.aclose()
+    await app.state.oai.close()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allow all origins for testing. Replace with specific domains in production.
@@ -396,7 +755,7 @@ app.add_middleware(
 
 
 @app.post("/api/directions", response_model=DirectionsResponse)
-def get_directions(request: PromptRequest):
+async def get_directions(request: PromptRequest):
     """
     POST /api/directions
     Body: { "prompt": "Your navigation request" }
@@ -408,28 +767,29 @@ def get_directions(request: PromptRequest):
       round_trip: boolean
       notes: any extra clarifications from the parser
     """
-    result = process_user_prompt(request.prompt)
+    result = await process_user_prompt(request.prompt)
     return DirectionsResponse(
         polyline=result["polyline"],
         instructions=result["instructions"],
-        waypoints=[
-            WaypointDetail(
-                name=wp["name"],
-                address=wp["address"],
-                coordinates=list(wp["coordinates"]),
-                type=wp["type"],
-                hours=wp.get("hours", []),
-                photos=wp.get("photos", [])
-            )
-            for wp in result["waypoints"]
-        ],
+        waypoints=result["waypoints"],
         round_trip=result["round_trip"],
         notes=result["notes"],
         legs=result.get("legs", [])
     )
 
 
-# For local testing (e.g., `python multi_waypoint_api.py`)
+# For local testing (e.g., `python main.py`)
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop + httptools for a faster event loop and HTTP parser, one worker per core.
+    # uvloop isn't available on Windows, where uvicorn's default loop is used instead.
+    # Each worker is its own process and builds its own clients in `lifespan`.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+        http="httptools",
+        workers=os.cpu_count()
+    )